@@ -9,26 +9,47 @@ in simulation mode using CoinGecko price data.
 No live exchange integration permitted at this time.
 """
 
-import requests
+import asyncio
+import aiohttp
+import atexit
+import math
 import time
-import random
 import csv
+import io
 import argparse
 import signal
 import sys
 import os
 import logging
+import numpy as np
 from datetime import datetime, timedelta
 from pathlib import Path
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-from contextlib import contextmanager
-import fcntl
+from concurrent.futures import ThreadPoolExecutor
+from aiohttp_retry import RetryClient, ExponentialRetry
+
+try:
+    import orjson as _json  # Faster parsing of CoinGecko payloads
+except ImportError:
+    import json as _json
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:  # Without pyarrow the CSV log is never rotated
+    pa = None
 
 # Dynamic configuration - no hardcoded paths
 BASE_DIR = Path(__file__).resolve().parent
 LOG_FILE = BASE_DIR / "bue_log.csv"
 BOT_LOG_FILE = BASE_DIR / "bot.log"
+LOG_HEADER = [
+    "session_id", "timestamp", "symbol", "price", "bue", "delta", 
+    "signal", "value_estimate", "action", "pnl", "close_reason", "equity"
+]
+LOG_ARCHIVE_PREFIX = "bue_log_archive_"  # Parquet archives: <prefix>YYYYMMDD_HHMMSS.parquet
+LOG_ROTATE_INTERVAL = int(os.getenv('LOG_ROTATE_INTERVAL', 3600))  # Seconds between rotations
+LOG_ROTATE_GRACE = 0.1  # Seconds a writer on the old CSV gets to finish after a swap
 
 # Trading configuration - environment variable driven
 RISK_PER_TRADE = float(os.getenv('RISK_PER_TRADE', 0.05))
@@ -41,6 +62,35 @@ STOP_LOSS_PCT = float(os.getenv('STOP_LOSS_PCT', 0.03))
 TAKE_PROFIT_PCT = float(os.getenv('TAKE_PROFIT_PCT', 0.05))
 FEE_PCT = float(os.getenv('FEE_PCT', 0.001))
 MAX_POSITIONS = int(os.getenv('MAX_POSITIONS', 3))
+RANDOM_SEED = os.getenv('RANDOM_SEED')  # Optional - makes BUE noise reproducible
+PRICE_HISTORY_WINDOW = 20  # Rolling window of prices kept per symbol
+BUE_NOISE = 0.008  # Random component of the BUE value (±0.8%)
+
+# Exit level multipliers keyed by side sign (+1 BUY, -1 SELL)
+TRAILING_STOP_FACTOR = {1: 1 - TRAILING_STOP_PCT, -1: 1 + TRAILING_STOP_PCT}
+STOP_LOSS_FACTOR = {1: 1 - STOP_LOSS_PCT, -1: 1 + STOP_LOSS_PCT}
+TAKE_PROFIT_FACTOR = {1: 1 + TAKE_PROFIT_PCT, -1: 1 - TAKE_PROFIT_PCT}
+
+# Column types for Parquet archives of the trade log
+if pa is not None:
+    LOG_ARROW_TYPES = {
+        "session_id": pa.string(), "timestamp": pa.timestamp('s'), "symbol": pa.string(),
+        "price": pa.float64(), "bue": pa.float64(), "delta": pa.float64(),
+        "signal": pa.string(), "value_estimate": pa.float64(), "action": pa.string(),
+        "pnl": pa.float64(), "close_reason": pa.string(), "equity": pa.float64()
+    }
+
+# Chronological read order for a full ring buffer, indexed by head position
+_RING_ORDER = (np.arange(PRICE_HISTORY_WINDOW)[None, :] +
+               np.arange(PRICE_HISTORY_WINDOW)[:, None]) % PRICE_HISTORY_WINDOW
+
+# CoinGecko API access
+COINGECKO_MARKETS_URL = 'https://api.coingecko.com/api/v3/coins/markets'
+COINGECKO_PAGE_SIZE = 100  # API limit compliance
+COINGECKO_MAX_CONCURRENCY = 4  # Parallel page requests (rate limit friendly)
+RETRY_TOTAL = 3
+RETRY_BACKOFF_FACTOR = 2
+RETRY_STATUSES = {429, 500, 502, 503, 504}
 
 # UK Banking Compliance Check
 LIVE_MODE_ENABLED = False  # Hardcoded to False for UK compliance
@@ -84,223 +134,417 @@ def setup_logging():
     logging.setLogRecordFactory(record_factory)
     return logger
 
-@contextmanager
-def safe_file_operation(file_path, mode='r', timeout=3):
-    """Professional file locking with timeout"""
-    if not file_path.exists():
-        if 'w' in mode or 'a' in mode:
-            file_path.parent.mkdir(exist_ok=True)
-        else:
-            yield None
-            return
+class Position:
+    """
+    An open simulated position
     
-    start_time = time.time()
-    while time.time() - start_time < timeout:
-        try:
-            with open(file_path, mode) as f:
-                if 'r' in mode:
-                    fcntl.flock(f, fcntl.LOCK_SH | fcntl.LOCK_NB)
-                else:
-                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
-                yield f
-                return
-        except (IOError, OSError, BlockingIOError):
-            time.sleep(0.1)
-    
-    logging.warning(f"File lock timeout: {file_path}")
-    yield None
+    Exit levels are fixed when the position opens (the trailing level moves
+    with peak_price), so checking exits needs no further arithmetic.
+    side_sign is +1 for BUY and -1 for SELL.
+    """
+    __slots__ = (
+        "entry_price", "quantity", "timestamp", "peak_price", "side", "trade_value",
+        "side_sign", "trailing_stop_level", "stop_loss_level", "take_profit_level", "expiry_time"
+    )
+
+    def __init__(self, entry_price, quantity, timestamp, peak_price, side, trade_value):
+        sign = 1 if side == "BUY" else -1
+        self.entry_price = entry_price
+        self.quantity = quantity
+        self.timestamp = timestamp
+        self.peak_price = peak_price
+        self.side = side
+        self.trade_value = trade_value
+        self.side_sign = sign
+        self.trailing_stop_level = peak_price * TRAILING_STOP_FACTOR[sign]
+        self.stop_loss_level = entry_price * STOP_LOSS_FACTOR[sign]
+        self.take_profit_level = entry_price * TAKE_PROFIT_FACTOR[sign]
+        self.expiry_time = timestamp + timedelta(seconds=TRADE_DURATION)
+
+def write_all(fd, data):
+    """
+    Write every byte of data to fd, resuming after a short write
+    Raises OSError if the file stops accepting data
+    """
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        if written == 0:
+            raise OSError("short write to trade log")
+        view = view[written:]
 
 class BotManager:
     def __init__(self):
         self.prices = {}
-        self.price_history = {}
+        
+        # Price history ring buffer (one row per symbol)
+        self._price_rows = {}
+        self._price_ring = np.zeros((TOP_N, PRICE_HISTORY_WINDOW), dtype=np.float64)
+        self._price_head = np.zeros(TOP_N, dtype=np.int64)
+        self._price_count = np.zeros(TOP_N, dtype=np.int64)
+        self._rng = np.random.default_rng(int(RANDOM_SEED) if RANDOM_SEED else None)
+        
         self.cash = PORTFOLIO_INITIAL
         self.portfolio_value = PORTFOLIO_INITIAL
         self.positions = {}
+        
+        # Struct-of-arrays mirror of self.positions for vectorised equity
+        self._pos_symbols = []
+        self._pos_qty = np.empty(0)
+        self._pos_entry = np.empty(0)
+        self._pos_trade_value = np.empty(0)
+        self._pos_side_sign = np.empty(0)
+        self._positions_version = 0
+        self._equity_prices = None
+        self._equity_key = None
+        self._equity_value = PORTFOLIO_INITIAL
+        
         self.state_saved = False
         self.last_activity = datetime.now()
         self.total_api_calls = 0
-        self.session = self._create_robust_session()
+        self._aio_session = None  # Created lazily inside the event loop
+        self._http_client = None
+        self._page_semaphore = None
         
         # Ensure required directories exist
         BASE_DIR.mkdir(exist_ok=True)
         
-        logging.info("SpiralBot v2.1 initialized - UK Banking Compliant (CoinGecko Only)")
-
-    def _create_robust_session(self):
-        """Create HTTP session with robust retry strategy"""
-        session = requests.Session()
+        # Long-lived O_APPEND descriptor; rows are buffered and flushed per cycle
+        self._ensure_log_file()
+        self._log_fd = self._open_log()
+        self._row_buffer = []
         
-        # Retry strategy for CoinGecko API
-        retry_strategy = Retry(
-            total=3,
-            backoff_factor=2,
-            status_forcelist=[429, 500, 502, 503, 504],
-            allowed_methods=["GET"]
-        )
+        # Disk writes run on one background thread so they overlap the next cycle
+        self._io_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="spiralbot-io")
+        self._pending_flush = None
+        self._last_rotation = time.monotonic()
+        atexit.register(self._close_log)
         
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        session.mount("http://", adapter)
-        session.mount("https://", adapter)
+        logging.info("SpiralBot v2.1 initialized - UK Banking Compliant (CoinGecko Only)")
+
+    def _get_http_client(self):
+        """Return the persistent retrying HTTP client, creating it on first use"""
+        if self._aio_session is None or self._aio_session.closed:
+            self._aio_session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=15),
+                connector=aiohttp.TCPConnector(
+                    limit=10,
+                    limit_per_host=COINGECKO_MAX_CONCURRENCY
+                ),
+                headers={
+                    'User-Agent': 'SpiralBot/2.1 (UK-Compliant-Trading-Simulator)',
+                    'Accept': 'application/json'
+                }
+            )
+            
+            # Same policy as the old urllib3 Retry: backoff_factor * 2**(n-1)
+            retry_options = ExponentialRetry(
+                attempts=RETRY_TOTAL + 1,
+                start_timeout=RETRY_BACKOFF_FACTOR / 2,
+                factor=2,
+                statuses=RETRY_STATUSES,
+                exceptions={aiohttp.ClientConnectionError, asyncio.TimeoutError},
+                retry_all_server_errors=False
+            )
+            self._http_client = RetryClient(
+                client_session=self._aio_session,
+                retry_options=retry_options
+            )
+            self._page_semaphore = asyncio.Semaphore(COINGECKO_MAX_CONCURRENCY)
+        return self._http_client
+
+    async def _close_aio_session(self):
+        """Close the aiohttp session if one was opened"""
+        if self._aio_session is not None and not self._aio_session.closed:
+            await self._aio_session.close()
+
+    async def _get_page(self, page, per_page):
+        """Fetch a single page of CoinGecko market data"""
+        params = {
+            'vs_currency': 'usd',
+            'order': 'market_cap_desc',
+            'per_page': per_page,
+            'page': page,
+            'sparkline': 'false',
+            'price_change_percentage': '24h'
+        }
         
-        # Professional headers
-        session.headers.update({
-            'User-Agent': 'SpiralBot/2.1 (UK-Compliant-Trading-Simulator)',
-            'Accept': 'application/json'
-        })
+        client = self._get_http_client()
         
-        return session
+        async with self._page_semaphore:
+            self.total_api_calls += 1
+            async with client.get(COINGECKO_MARKETS_URL, params=params) as response:
+                response.raise_for_status()
+                return _json.loads(await response.read())
 
-    def fetch_coingecko_data(self, n=TOP_N):
+    async def fetch_coingecko_data_async(self, n=TOP_N):
         """
         Fetch cryptocurrency price data from CoinGecko API
         
+        Pages of up to 100 coins are requested concurrently, so fetching
+        the top 500 costs roughly the same wall-clock time as the top 100.
+        
         Note: This is the ONLY permitted data source due to UK banking restrictions.
         Live exchange APIs (Binance, Coinbase, etc.) are not compatible with UK bank accounts.
         """
-        url = 'https://api.coingecko.com/api/v3/coins/markets'
-        params = {
-            'vs_currency': 'usd',
-            'order': 'market_cap_desc',
-            'per_page': min(n, 100),  # API limit compliance
-            'page': 1,
-            'sparkline': 'false',
-            'price_change_percentage': '24h'
-        }
+        per_page = min(n, COINGECKO_PAGE_SIZE)
+        pages = math.ceil(n / per_page)
         
-        try:
-            self.total_api_calls += 1
-            response = self.session.get(url, params=params, timeout=15)
-            response.raise_for_status()
-            
-            data = response.json()
-            if not isinstance(data, list):
+        results = await asyncio.gather(
+            *[self._get_page(page, per_page) for page in range(1, pages + 1)],
+            return_exceptions=True
+        )
+        
+        # Merge pages in market-cap order
+        items = []
+        for page, data in enumerate(results, start=1):
+            if isinstance(data, (aiohttp.ClientError, asyncio.TimeoutError)):
+                logging.error("CoinGecko API error (page %d): %s", page, data)
+            elif isinstance(data, (ValueError, KeyError)):
+                logging.error("Data parsing error (page %d): %s", page, data)
+            elif isinstance(data, BaseException):
+                raise data
+            elif not isinstance(data, list):
                 logging.error("CoinGecko API returned unexpected format: %s", data)
-                return {}
-            
-            # Extract price data with validation
-            price_data = {}
-            for item in data:
-                symbol = item.get("symbol", "").upper()
-                price = item.get("current_price")
-                
-                if symbol and price is not None and price > 0:
-                    price_data[symbol] = float(price)
-            
-            logging.info("Fetched %d prices from CoinGecko (API call #%d)", 
-                        len(price_data), self.total_api_calls)
-            return price_data
+            else:
+                items.extend(data)
+        
+        # Extract price data with validation
+        price_data = {}
+        for item in items[:n]:
+            symbol = item.get("symbol", "").upper()
+            price = item.get("current_price")
             
-        except requests.exceptions.RequestException as e:
-            logging.error("CoinGecko API error: %s", e)
-            return {}
-        except (ValueError, KeyError) as e:
-            logging.error("Data parsing error: %s", e)
-            return {}
-
-    def calculate_bue_value(self, symbol, current_price):
+            if symbol and price is not None and price > 0:
+                price_data[symbol] = float(price)
+        
+        logging.info("Fetched %d prices from CoinGecko (%d pages, API calls: %d)", 
+                    len(price_data), pages, self.total_api_calls)
+        return price_data
+
+    def _grow_price_ring(self):
+        """Double the number of symbol rows in the price ring buffer"""
+        rows = max(1, 2 * self._price_ring.shape[0])
+        self._price_ring = np.resize(self._price_ring, (rows, PRICE_HISTORY_WINDOW))
+        self._price_head = np.resize(self._price_head, rows)
+        self._price_count = np.resize(self._price_count, rows)
+        
+        # np.resize repeats existing data - new rows must start empty
+        used = len(self._price_rows)
+        self._price_head[used:] = 0
+        self._price_count[used:] = 0
+
+    def _record_prices(self, symbols, prices):
+        """Append one price per symbol to the ring buffer and return their rows"""
+        rows = np.empty(len(symbols), dtype=np.int64)
+        for i, symbol in enumerate(symbols):
+            row = self._price_rows.get(symbol)
+            if row is None:
+                row = len(self._price_rows)
+                if row >= self._price_ring.shape[0]:
+                    self._grow_price_ring()
+                self._price_rows[symbol] = row
+            rows[i] = row
+        
+        heads = self._price_head[rows]
+        self._price_ring[rows, heads] = prices
+        self._price_head[rows] = (heads + 1) % PRICE_HISTORY_WINDOW
+        self._price_count[rows] = np.minimum(self._price_count[rows] + 1, PRICE_HISTORY_WINDOW)
+        
+        return rows
+
+    def calculate_bue_values(self, rows, current_prices, random_components):
         """
-        Calculate BUE (Bot's Understanding of Expected) value
+        Calculate BUE (Bot's Understanding of Expected) values
         Uses technical analysis instead of pure randomness
-        """
-        if symbol not in self.price_history:
-            self.price_history[symbol] = []
-        
-        self.price_history[symbol].append(current_price)
         
-        # Maintain rolling window of 20 prices
-        if len(self.price_history[symbol]) > 20:
-            self.price_history[symbol].pop(0)
+        Vectorised over all symbols: rows index the price ring buffer and
+        line up with current_prices and random_components.
+        """
+        counts = self._price_count[rows]
         
-        # Insufficient data - return current price
-        if len(self.price_history[symbol]) < 5:
-            return current_price
+        # Oldest-to-newest view of each symbol's ring buffer
+        window = np.take_along_axis(
+            self._price_ring[rows], _RING_ORDER[self._price_head[rows]], axis=1
+        )
         
         # Calculate momentum factor (trend analysis)
-        momentum_factor = 0
-        if len(self.price_history[symbol]) >= 10:
-            recent_avg = sum(self.price_history[symbol][-5:]) / 5
-            older_avg = sum(self.price_history[symbol][-10:-5]) / 5
-            
-            if older_avg > 0:
-                momentum_factor = (recent_avg - older_avg) / older_avg * 0.15
+        recent_avg = window[:, -5:].mean(axis=1)
+        older_avg = window[:, -10:-5].mean(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            momentum_factor = np.where(
+                older_avg > 0, (recent_avg - older_avg) / older_avg * 0.15, 0.0
+            )
         
         # Calculate volatility factor
-        volatility_factor = 0
-        if len(self.price_history[symbol]) >= 10:
-            recent_prices = self.price_history[symbol][-10:]
-            price_range = max(recent_prices) - min(recent_prices)
-            
-            if current_price > 0:
-                volatility = price_range / current_price
-                volatility_factor = min(max(volatility * 0.08, -0.03), 0.03)
-        
-        # Minimal random component for market unpredictability
-        random_component = random.uniform(-0.008, 0.008)  # ±0.8%
-        
-        # Combine factors
-        total_adjustment = momentum_factor + volatility_factor + random_component
-        bue_value = current_price * (1 + total_adjustment)
+        recent_prices = window[:, -10:]
+        price_range = recent_prices.max(axis=1) - recent_prices.min(axis=1)
+        volatility_factor = np.clip(price_range / current_prices * 0.08, -0.03, 0.03)
+        
+        # Trend factors need 10 prices; below that only the random component applies
+        total_adjustment = np.where(
+            counts >= 10, momentum_factor + volatility_factor, 0.0
+        ) + random_components
+        bue_values = np.round(current_prices * (1 + total_adjustment), 8)
+        
+        # Insufficient data - use current price
+        return np.where(counts >= 5, bue_values, current_prices)
+
+    def generate_signals(self, current_prices, bue_values):
+        """Generate trading signals based on BUE analysis (vectorised)"""
+        delta = ((bue_values - current_prices) / current_prices) * 100
         
-        return round(bue_value, 8)
+        # Conservative thresholds for quality signals
+        signals = np.where(delta > 1.2, "BUY", np.where(delta < -1.2, "SELL", "HOLD"))
+        return signals, delta
 
-    def generate_signal(self, current_price, bue_value):
-        """Generate trading signal based on BUE analysis"""
-        if current_price <= 0:
-            return "HOLD", 0.0
+    def _ensure_log_file(self):
+        """Create the trade log with its header, or verify an existing header"""
+        if not LOG_FILE.exists() or LOG_FILE.stat().st_size == 0:
+            with open(LOG_FILE, 'w', newline='') as f:
+                csv.writer(f).writerow(LOG_HEADER)
+            return
         
-        delta = ((bue_value - current_price) / current_price) * 100
+        with open(LOG_FILE, 'r', newline='') as f:
+            existing_header = next(csv.reader(f), [])
         
-        # Conservative thresholds for quality signals
-        if delta > 1.2:
-            return "BUY", delta
-        elif delta < -1.2:
-            return "SELL", delta
-        else:
-            return "HOLD", delta
+        if existing_header != LOG_HEADER:
+            logging.warning("Unexpected header in %s: %s", LOG_FILE, existing_header)
 
     def log_to_csv(self, row_data):
         """
-        Professional CSV logging with retry logic
-        Ensures data integrity during concurrent access
+        Queue a row for the trade log
+        Rows are written in one batch by flush_log at the end of each cycle
         """
-        header = [
-            "session_id", "timestamp", "symbol", "price", "bue", "delta", 
-            "signal", "value_estimate", "action", "pnl", "close_reason", "equity"
-        ]
-        
         # Ensure session_id is properly formatted
-        if len(row_data) == len(header) - 1:
+        if len(row_data) == len(LOG_HEADER) - 1:
             row_data.insert(0, session_id)
-        elif len(row_data) == len(header) and row_data[0] != session_id:
+        elif len(row_data) == len(LOG_HEADER) and row_data[0] != session_id:
             row_data[0] = session_id
         
-        # Ensure log file exists with header
-        if not LOG_FILE.exists():
-            try:
-                with open(LOG_FILE, 'w', newline='') as f:
-                    writer = csv.writer(f)
-                    writer.writerow(header)
-            except Exception as e:
-                logging.error("Failed to create log file: %s", e)
-                return False
-        
-        # Append data with retry logic
-        for attempt in range(3):
-            try:
-                with open(LOG_FILE, 'a', newline='') as f:
-                    writer = csv.writer(f)
-                    writer.writerow(row_data)
+        self._row_buffer.append(row_data)
+        self.state_saved = True
+        return True
+
+    def flush_log(self):
+        """
+        Hand all queued rows to the I/O thread for a single batched write
+        Returns the pending future; at most one flush is in flight at a time.
+        """
+        if not self._row_buffer:
+            return self._pending_flush
+        
+        if self._pending_flush is not None:
+            self._pending_flush.result()
+        
+        rows, self._row_buffer = self._row_buffer, []
+        self._pending_flush = self._io_pool.submit(self._write_rows, rows)
+        return self._pending_flush
+
+    def _open_log(self):
+        """Open the trade log for appending at the OS level"""
+        return os.open(LOG_FILE, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def _write_rows(self, rows):
+        """
+        Write rows to the trade log with a single O_APPEND write
+        One write per batch keeps dashboard deposits from landing mid-row
+        """
+        buffer = io.StringIO()
+        try:
+            csv.writer(buffer).writerows(rows)
+            write_all(self._log_fd, buffer.getvalue().encode())
+        except (OSError, ValueError, csv.Error) as e:
+            logging.error("CSV write error: %s", e)
+            return False
+        
+        return True
+
+    def rotate_log_if_due(self):
+        """
+        Queue a Parquet archive rotation once LOG_ROTATE_INTERVAL has passed
+        The rotation runs on the I/O thread after any queued writes
+        """
+        if pa is None or time.monotonic() - self._last_rotation < LOG_ROTATE_INTERVAL:
+            return None
+        
+        self._last_rotation = time.monotonic()
+        self._pending_flush = self._io_pool.submit(self._rotate_log)
+        return self._pending_flush
+
+    def _rotate_log(self):
+        """
+        Move the rows logged so far into a new Parquet archive and restart the CSV
+        Parquet files cannot be appended to, so every rotation writes its own archive
+        """
+        try:
+            with open(LOG_FILE, 'rb') as old:
+                data = old.read()
                 
-                self.state_saved = True
-                return True
+                # Archive complete rows only; anything after them stays in the CSV
+                header_end = data.find(b'\n') + 1
+                end = data.rfind(b'\n') + 1
+                if end <= header_end:
+                    return True
                 
-            except Exception as e:
-                logging.error("CSV write error (attempt %d): %s", attempt + 1, e)
-                time.sleep(0.2)
+                table = pa_csv.read_csv(
+                    pa.BufferReader(data[:end]),
+                    convert_options=pa_csv.ConvertOptions(column_types=LOG_ARROW_TYPES, strings_can_be_null=True)
+                )
+                stamp = f"{LOG_ARCHIVE_PREFIX}{datetime.now():%Y%m%d_%H%M%S}"
+                archive = LOG_FILE.with_name(f"{stamp}.parquet")
+                suffix = 0
+                while archive.exists():  # Never overwrite an archive from the same second
+                    suffix += 1
+                    archive = LOG_FILE.with_name(f"{stamp}_{suffix:03d}.parquet")
+                staged = archive.with_name(archive.name + ".tmp")
+                pq.write_table(table, staged)
+                
+                # Publish the archive first; the dashboard de-duplicates rows
+                # that are briefly in both the archive and the CSV
+                os.replace(staged, archive)
+                
+                # Build the fresh CSV aside and swap it in, so the log never goes missing
+                fresh = LOG_FILE.with_name(LOG_FILE.name + ".tmp")
+                with open(fresh, 'wb') as f:
+                    f.write(data[:header_end])
+                    f.write(data[end:])
+                    f.write(old.read())  # Rows appended since the first read
+                os.replace(fresh, LOG_FILE)
+                os.close(self._log_fd)
+                self._log_fd = None
+                self._log_fd = self._open_log()
+                
+                # A deposit that opened the old file before the swap may still be
+                # mid-write; give it a moment, then carry it over
+                time.sleep(LOG_ROTATE_GRACE)
+                late = old.read()
+                if late:
+                    write_all(self._log_fd, late)
+            
+            logging.info("Archived %d log rows to %s", table.num_rows, archive.name)
+            
+        except (OSError, ValueError, pa.ArrowException) as e:
+            logging.error("Log rotation error: %s", e)
+            return False
+        
+        finally:
+            if self._log_fd is None:
+                self._log_fd = self._open_log()
+        
+        return True
+
+    def _close_log(self):
+        """Drain the I/O thread, write any queued rows and close the trade log"""
+        if self._log_fd is None:
+            return
         
-        logging.error("Failed to write to CSV after 3 attempts")
-        return False
+        self._io_pool.shutdown(wait=True)
+        if self._row_buffer:
+            self._write_rows(self._row_buffer)
+            self._row_buffer.clear()
+        os.close(self._log_fd)
+        self._log_fd = None
 
     def deposit_funds(self, amount):
         """Process fund deposit - simulation only"""
@@ -322,10 +566,12 @@ class BotManager:
         
         return self.log_to_csv(deposit_row)
 
-    def execute_trade(self, symbol, signal, price, delta):
+    def execute_trade(self, symbol, signal, price, delta, timestamp=None):
         """
         Execute simulated trade
         
+        timestamp is the preformatted log time; defaults to now.
+        
         Note: All trades are SIMULATION ONLY due to UK banking restrictions.
         No real money or exchange APIs are involved.
         """
@@ -353,20 +599,22 @@ class BotManager:
         quantity = net_trade_value / price
         
         # Open position
-        self.positions[symbol] = {
-            "entry_price": price,
-            "quantity": quantity,
-            "timestamp": datetime.now(),
-            "peak_price": price,
-            "side": signal,
-            "trade_value": net_trade_value
-        }
+        self.positions[symbol] = Position(
+            entry_price=price,
+            quantity=quantity,
+            timestamp=datetime.now(),
+            peak_price=price,
+            side=signal,
+            trade_value=net_trade_value
+        )
+        self._sync_position_arrays()
         
         # Update cash
         self.cash -= trade_value
         self.last_activity = datetime.now()
         
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        if timestamp is None:
+            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         logging.info("SIMULATED %s: %s @ £%.4f | Qty: %.6f | Fee: £%.2f", 
                     signal, symbol, price, quantity, fee)
         
@@ -378,22 +626,25 @@ class BotManager:
         
         return self.log_to_csv(trade_row)
 
-    def close_position(self, symbol, current_price, reason):
-        """Close a trading position with P&L calculation"""
+    def close_position(self, symbol, current_price, reason, timestamp=None):
+        """
+        Close a trading position with P&L calculation
+        timestamp is the preformatted log time; defaults to now.
+        """
         if symbol not in self.positions:
             return 0, "NONE", reason
         
         pos = self.positions[symbol]
-        entry_price = pos["entry_price"]
-        quantity = pos["quantity"]
-        side = pos["side"]
+        entry_price = pos.entry_price
+        quantity = pos.quantity
+        side = pos.side
         
         # Calculate P&L based on position side
         if side == "BUY":
             proceeds = quantity * current_price
-            pnl = proceeds - pos["trade_value"]
+            pnl = proceeds - pos.trade_value
         else:  # SELL
-            proceeds = pos["trade_value"]
+            proceeds = pos.trade_value
             cost = quantity * current_price
             pnl = proceeds - cost
         
@@ -406,7 +657,8 @@ class BotManager:
         action = f"CLOSE_{side}"
         self.last_activity = datetime.now()
         
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        if timestamp is None:
+            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         logging.info("SIMULATED %s: %s @ £%.4f | P&L: £%.2f | Reason: %s", 
                     action, symbol, current_price, net_pnl, reason)
         
@@ -420,73 +672,92 @@ class BotManager:
         
         # Remove position
         del self.positions[symbol]
+        self._sync_position_arrays()
         return net_pnl, action, reason
 
+    def _sync_position_arrays(self):
+        """Rebuild the position arrays after a position is opened or closed"""
+        positions = list(self.positions.values())
+        self._pos_symbols = list(self.positions.keys())
+        self._pos_qty = np.array([pos.quantity for pos in positions], dtype=np.float64)
+        self._pos_entry = np.array([pos.entry_price for pos in positions], dtype=np.float64)
+        self._pos_trade_value = np.array([pos.trade_value for pos in positions], dtype=np.float64)
+        self._pos_side_sign = np.array([pos.side_sign for pos in positions], dtype=np.float64)
+        self._positions_version += 1
+
     def calculate_equity(self, current_prices):
         """Calculate total portfolio value including unrealized P&L"""
-        unrealized_pnl = 0
-        
-        for symbol, pos in self.positions.items():
-            current_price = current_prices.get(symbol, pos["entry_price"])
-            
-            if pos["side"] == "BUY":
-                market_value = pos["quantity"] * current_price
-                unrealized_pnl += market_value - pos["trade_value"]
-            else:  # SELL
-                cost = pos["quantity"] * current_price
-                unrealized_pnl += pos["trade_value"] - cost
+        # Reuse the last result while prices, positions and cash are unchanged
+        key = (self._positions_version, self.cash)
+        if current_prices is self._equity_prices and key == self._equity_key:
+            self.portfolio_value = self._equity_value
+            return self.portfolio_value
+        
+        if self._pos_symbols:
+            current = np.array([
+                current_prices.get(symbol, entry)
+                for symbol, entry in zip(self._pos_symbols, self._pos_entry.tolist())
+            ])
+            # BUY: market value - cost; SELL: cost - market value
+            unrealized_pnl = float(np.sum(
+                self._pos_side_sign * (self._pos_qty * current - self._pos_trade_value)
+            ))
+        else:
+            unrealized_pnl = 0
         
         self.portfolio_value = self.cash + unrealized_pnl
+        self._equity_prices = current_prices
+        self._equity_key = key
+        self._equity_value = self.portfolio_value
         return self.portfolio_value
 
-    def manage_positions(self, current_prices):
-        """Manage open positions with risk controls"""
+    def manage_positions(self, current_prices, timestamp=None):
+        """
+        Manage open positions with risk controls
+        
+        Every open position is checked; returns a list of
+        (pnl, action, reason) tuples, one per position closed.
+        timestamp is passed through to close_position.
+        """
+        closures = []
         if not self.positions:
-            return 0, "NONE", "N/A"
+            return closures
         
         current_time = datetime.now()
+        trailing_factor = TRAILING_STOP_FACTOR
         
         for symbol in list(self.positions.keys()):
             pos = self.positions[symbol]
-            current_price = current_prices.get(symbol, pos["entry_price"])
-            
-            # Update peak price for trailing stops
-            if pos["side"] == "BUY":
-                pos["peak_price"] = max(pos["peak_price"], current_price)
-            else:
-                pos["peak_price"] = min(pos["peak_price"], current_price)
-            
-            peak_price = pos["peak_price"]
-            entry_price = pos["entry_price"]
+            current_price = current_prices.get(symbol, pos.entry_price)
             
-            # Check exit conditions
+            sign = pos.side_sign
             
-            # 1. Trailing stop loss
-            if pos["side"] == "BUY" and current_price <= peak_price * (1 - TRAILING_STOP_PCT):
-                return self.close_position(symbol, current_price, "TRAILING_STOP")
-            elif pos["side"] == "SELL" and current_price >= peak_price * (1 + TRAILING_STOP_PCT):
-                return self.close_position(symbol, current_price, "TRAILING_STOP")
+            # Update peak price (and the trailing stop that follows it)
+            if sign * (current_price - pos.peak_price) > 0:
+                pos.peak_price = current_price
+                pos.trailing_stop_level = current_price * trailing_factor[sign]
             
-            # 2. Hard stop loss
-            if pos["side"] == "BUY" and current_price <= entry_price * (1 - STOP_LOSS_PCT):
-                return self.close_position(symbol, current_price, "STOP_LOSS")
-            elif pos["side"] == "SELL" and current_price >= entry_price * (1 + STOP_LOSS_PCT):
-                return self.close_position(symbol, current_price, "STOP_LOSS")
-            
-            # 3. Take profit
-            if pos["side"] == "BUY" and current_price >= entry_price * (1 + TAKE_PROFIT_PCT):
-                return self.close_position(symbol, current_price, "TAKE_PROFIT")
-            elif pos["side"] == "SELL" and current_price <= entry_price * (1 - TAKE_PROFIT_PCT):
-                return self.close_position(symbol, current_price, "TAKE_PROFIT")
+            # Check exit conditions, in priority order
+            if sign * (current_price - pos.trailing_stop_level) <= 0:
+                reason = "TRAILING_STOP"
+            elif sign * (current_price - pos.stop_loss_level) <= 0:
+                reason = "STOP_LOSS"
+            elif sign * (current_price - pos.take_profit_level) >= 0:
+                reason = "TAKE_PROFIT"
+            elif current_time >= pos.expiry_time:
+                reason = "TIMED_EXIT"
+            else:
+                continue
             
-            # 4. Time-based exit
-            position_age = (current_time - pos["timestamp"]).total_seconds()
-            if position_age >= TRADE_DURATION:
-                return self.close_position(symbol, current_price, "TIMED_EXIT")
+            closures.append(self.close_position(symbol, current_price, reason, timestamp))
         
-        return 0, "NONE", "N/A"
+        return closures
 
     def run_simulation(self):
+        """Run the simulation loop on a fresh asyncio event loop"""
+        asyncio.run(self.run_simulation_async())
+
+    async def run_simulation_async(self):
         """
         Main simulation loop
         
@@ -513,6 +784,8 @@ class BotManager:
                 ]
                 self.log_to_csv(shutdown_row)
             
+            self._close_log()
+            
             logging.info("Final Portfolio Value: £%.2f", self.portfolio_value)
             logging.info("Total API Calls: %d", self.total_api_calls)
             logging.info("SpiralBot shutdown complete")
@@ -523,64 +796,87 @@ class BotManager:
         signal.signal(signal.SIGINT, graceful_shutdown)
         signal.signal(signal.SIGTERM, graceful_shutdown)
         
+        try:
+            await self._simulation_loop()
+        finally:
+            await self._close_aio_session()
+
+    async def _simulation_loop(self):
+        """Fetch, score and trade once per SCAN_INTERVAL until interrupted"""
         cycle_count = 0
+        max_positions = MAX_POSITIONS
+        loop = asyncio.get_running_loop()
         
         while True:
-            cycle_start = time.time()
+            # Event loop clock is monotonic, so NTP/DST jumps can't skew pacing
+            cycle_start = loop.time()
             cycle_count += 1
             
             logging.info("=== Cycle %d ===", cycle_count)
             
             # Fetch market data from CoinGecko
-            self.prices = self.fetch_coingecko_data()
+            self.prices = await self.fetch_coingecko_data_async()
             
             if not self.prices:
                 logging.warning("No price data available - skipping cycle")
-                time.sleep(SCAN_INTERVAL)
+                await asyncio.sleep(SCAN_INTERVAL)
                 continue
             
-            # Process each symbol
-            for symbol, price in self.prices.items():
-                if price <= 0:
+            # Stamp the cycle once the prices are in - a retried fetch can take a minute
+            cycle_timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            
+            # Score every symbol at once from the price ring buffer
+            symbols = [symbol for symbol, price in self.prices.items() if price > 0]
+            prices = np.array([self.prices[symbol] for symbol in symbols], dtype=np.float64)
+            rows = self._record_prices(symbols, prices)
+            rand_batch = self._rng.uniform(-BUE_NOISE, BUE_NOISE, size=len(symbols))
+            bue_values = self.calculate_bue_values(rows, prices, rand_batch)
+            signals, deltas = self.generate_signals(prices, bue_values)
+            
+            # Pass 1: open positions on strong signals and queue scan rows
+            scan_rows = []
+            for symbol, price, bue_value, signal_type, delta in zip(
+                symbols, prices.tolist(), bue_values.tolist(), signals.tolist(), deltas.tolist()
+            ):
+                # Fully invested: no new position can be opened for this symbol
+                if len(self.positions) >= max_positions and symbol not in self.positions:
                     continue
                 
-                # Generate BUE value and signal
-                bue_value = self.calculate_bue_value(symbol, price)
-                signal_type, delta = self.generate_signal(price, bue_value)
-                
                 value_estimate = (self.cash / len(self.prices)) * (1 + delta / 100)
                 
                 # Execute trades on strong signals
-                if signal_type in ["BUY", "SELL"] and abs(delta) > 1.5:
-                    self.execute_trade(symbol, signal_type, price, delta)
-                
-                # Manage existing positions
-                pnl, action, close_reason = self.manage_positions(self.prices)
-                
-                # Update portfolio value
-                self.portfolio_value = self.calculate_equity(self.prices)
+                if signal_type != "HOLD" and abs(delta) > 1.5:
+                    self.execute_trade(symbol, signal_type, price, delta, cycle_timestamp)
                 
-                # Log market scan
-                timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                # Log market scan (equity is filled in after pass 2)
                 scan_row = [
-                    session_id, timestamp, symbol, price, bue_value, delta,
-                    signal_type, value_estimate, action if action != "NONE" else "SCAN",
-                    pnl, close_reason if close_reason != "N/A" else "N/A", self.portfolio_value
+                    session_id, cycle_timestamp, symbol, price, bue_value, delta,
+                    signal_type, value_estimate, "SCAN", 0, "N/A", self.portfolio_value
                 ]
                 
                 self.log_to_csv(scan_row)
-                
-                # Brief pause between symbols
-                time.sleep(0.05)
+                scan_rows.append(scan_row)
+            
+            # Pass 2: manage existing positions and value the portfolio once
+            closures = self.manage_positions(self.prices, cycle_timestamp)
+            self.portfolio_value = self.calculate_equity(self.prices)
+            
+            for scan_row in scan_rows:
+                scan_row[-1] = self.portfolio_value
+            
+            # Persist this cycle's rows in one background write
+            self.flush_log()
+            self.rotate_log_if_due()
             
             # Cycle summary
-            cycle_duration = time.time() - cycle_start
+            cycle_duration = loop.time() - cycle_start
             
-            logging.info("Cycle %d complete (%.2fs) | Positions: %d | Cash: £%.2f | Equity: £%.2f",
-                        cycle_count, cycle_duration, len(self.positions), self.cash, self.portfolio_value)
+            logging.info("Cycle %d complete (%.2fs) | Closed: %d | Positions: %d | Cash: £%.2f | Equity: £%.2f",
+                        cycle_count, cycle_duration, len(closures), len(self.positions),
+                        self.cash, self.portfolio_value)
             
             # Sleep until next cycle
-            time.sleep(max(0, SCAN_INTERVAL - cycle_duration))
+            await asyncio.sleep(max(0, SCAN_INTERVAL - cycle_duration))
 
 def main():
     """Main entry point with argument parsing"""
@@ -159,7 +159,8 @@ fi
 
 # Check if core packages are installed
 MISSING_PACKAGES=()
-for package in "streamlit" "pandas" "plotly" "requests" "psutil"; do
+for package in "streamlit" "streamlit_autorefresh" "pandas" "polars" "pyarrow" "plotly" \
+               "aiohttp" "aiohttp_retry" "psutil" "numpy" "orjson"; do
     if ! python3 -c "import $package" 2>/dev/null; then
         MISSING_PACKAGES+=("$package")
     fi
@@ -8,33 +8,51 @@ CoinGecko data only - No live exchange integration permitted
 
 import streamlit as st
 import pandas as pd
+import polars as pl
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 import time
 import os
-import csv
+import io
 import logging
 import subprocess
 import signal
 import psutil
+import pyarrow.dataset as ds
+from pyarrow import fs as pa_fs
+from pandas.api.types import union_categoricals
 from datetime import datetime, timedelta
 from pathlib import Path
-import fcntl
-from contextlib import contextmanager
+from streamlit_autorefresh import st_autorefresh
 
 # Dynamic configuration
 BASE_DIR = Path(__file__).resolve().parent
 LOG_FILE = BASE_DIR / "bue_log.csv"
+LOG_ARCHIVE_GLOB = "bue_log_archive_*.parquet"  # Rotated out of the CSV by the bot
 BOT_LOG_FILE = BASE_DIR / "bot.log"
 BOT_SCRIPT = BASE_DIR / "bue_flashbot_virtual.py"
 DASHBOARD_LOG_FILE = BASE_DIR / "dashboard.log"
 
+# Trade log schema
+REQUIRED_COLUMNS = ['timestamp', 'symbol', 'price', 'action', 'pnl', 'equity']
+LOG_DTYPES = {
+    'symbol': 'category',
+    'action': 'category',
+    # Kept at full precision - display, export and deposits all reuse these values
+    'price': 'float64',
+    'pnl': 'float64',
+    'equity': 'float64'
+}
+
 # Dashboard configuration
 PAGE_CONFIG = {
     "page_title": "SpiralBot v2.1 Dashboard",
     "layout": "wide",
     "initial_sidebar_state": "expanded"
 }
+REFRESH_INTERVAL_MS = 30_000
+BOT_STATUS_TTL = 2.0  # Seconds a bot status snapshot is reused across reruns
 
 # Setup professional logging
 logging.basicConfig(
@@ -65,112 +83,388 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-@contextmanager
-def safe_file_operation(file_path, mode='r', timeout=3):
-    """Professional file locking with timeout"""
-    if not file_path.exists():
-        if 'w' in mode or 'a' in mode:
-            file_path.parent.mkdir(exist_ok=True)
-        else:
-            yield None
-            return
+def _parse_log_rows(data, names=None, start=0):
+    """
+    Parse complete CSV lines from the trade log into a typed frame
+    Rows are numbered from start; returns the frame and the number of rows read
+    """
+    header = {} if names is None else {'header': None, 'names': names}
+    df = pd.read_csv(io.BytesIO(data), engine='pyarrow', dtype=LOG_DTYPES,
+                     parse_dates=['timestamp'], **header)
+    nrows = len(df)
+    df.index = pd.RangeIndex(start, start + nrows)
+    
+    # Malformed timestamps leave the column unparsed - coerce them to NaT
+    if not pd.api.types.is_datetime64_any_dtype(df['timestamp']):
+        df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
+    
+    # Arrow parses to second resolution - keep every batch in nanoseconds
+    df['timestamp'] = df['timestamp'].astype('datetime64[ns]')
+    
+    # Drop rows with missing timestamps
+    invalid_timestamps = df['timestamp'].isna().sum()
+    if invalid_timestamps > 0:
+        log_dashboard_event(f"Dropped {invalid_timestamps} rows with invalid timestamps", "warning")
+        df = df.dropna(subset=['timestamp'])
+    
+    return df, nrows
+
+def _deduplicate_log(df):
+    """Remove duplicates based on timestamp, symbol, and action"""
+    duplicates = df.duplicated(subset=['timestamp', 'symbol', 'action'], keep='last').sum()
+    if duplicates > 0:
+        log_dashboard_event(f"Removed {duplicates} duplicate entries", "warning")
+        df = df.drop_duplicates(subset=['timestamp', 'symbol', 'action'], keep='last')
+    return df
+
+def _read_log_from(path, offset):
+    """
+    Read the log from offset to its current end with a single pread
+    Returns None when the file has gone away
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except FileNotFoundError:
+        return None
+    try:
+        return os.pread(fd, max(os.fstat(fd).st_size - offset, 0), offset)
+    finally:
+        os.close(fd)
+
+def _write_all(fd, data):
+    """
+    Write every byte of data to fd, resuming after a short write
+    Raises OSError if the file stops accepting data
+    """
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        if written == 0:
+            raise OSError("short write to trade log")
+        view = view[written:]
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def _load_trading_data_cached(path, mtime, size):
+    """
+    Read, validate, sort and de-duplicate the trade log
+    Cached per (path, mtime, size) so reruns only re-parse a changed file
+    Returns the frame, the byte offset of the last complete line parsed
+    and the number of rows read
+    """
+    data = _read_log_from(path, 0)
+    if data is None:
+        st.error("Unable to access log file - it may have been removed")
+        log_dashboard_event("Log file access failed - file missing", "error")
+        return pd.DataFrame(), 0, 0
+    
+    # Validate required columns
+    columns = pd.read_csv(io.BytesIO(data), nrows=0).columns
+    missing_cols = [col for col in REQUIRED_COLUMNS if col not in columns]
     
-    start_time = time.time()
-    while time.time() - start_time < timeout:
+    if missing_cols:
+        st.error(f"Invalid log format. Missing required columns: {', '.join(missing_cols)}")
+        log_dashboard_event(f"Missing columns in log: {missing_cols}", "error")
+        return pd.DataFrame(), 0, 0
+    
+    # Leave a partially written last line for the next tail read
+    offset = data.rfind(b'\n') + 1
+    df, nrows = _parse_log_rows(data[:offset])
+    
+    # Sort by timestamp
+    df = df.sort_values('timestamp', kind='stable')
+    
+    return _deduplicate_log(df), offset, nrows
+
+def _log_keys(df):
+    """(timestamp, symbol, action) de-duplication keys for each row of df"""
+    # Category codes are not stable across batches, so key on the values
+    return list(zip(
+        df['timestamp'].to_numpy().view('int64').tolist(),
+        df['symbol'].astype(str).tolist(),
+        df['action'].astype(str).tolist()
+    ))
+
+def _align_categories(first, second):
+    """Give both frames the same symbol/action categories so concat keeps them categorical"""
+    for col in ('symbol', 'action'):
+        categories = union_categoricals([first[col], second[col]]).categories
+        first[col] = first[col].cat.set_categories(categories)
+        second[col] = second[col].cat.set_categories(categories)
+
+def _archive_signature():
+    """(name, mtime, size) of each Parquet log archive, oldest first"""
+    signature = []
+    for path in sorted(LOG_FILE.parent.glob(LOG_ARCHIVE_GLOB)):
         try:
-            with open(file_path, mode) as f:
-                if 'r' in mode:
-                    fcntl.flock(f, fcntl.LOCK_SH | fcntl.LOCK_NB)
-                else:
-                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
-                yield f
-                return
-        except (IOError, OSError, BlockingIOError):
-            time.sleep(0.1)
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        signature.append((path.name, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def _load_log_archives(signature):
+    """
+    Read the Parquet log archives as one memory-mapped Arrow dataset
+    Cached on the archive signature, so only a new rotation re-reads them
+    """
+    dataset = ds.dataset(
+        [str(LOG_FILE.parent / name) for name, _, _ in signature],
+        format='parquet',
+        filesystem=pa_fs.LocalFileSystem(use_mmap=True)
+    )
+    df = dataset.to_table().to_pandas().astype(LOG_DTYPES)
+    df['timestamp'] = df['timestamp'].astype('datetime64[ns]')
+    return df
+
+def _prepend_archives(archived, df, nrows):
+    """
+    Put the archived rows ahead of the rows parsed from the current CSV
+    CSV row labels move past the archive so tail reads keep numbering from nrows
+    Returns the combined frame and row count
+    """
+    if df.empty:
+        # A freshly rotated CSV parses to untyped empty columns - nothing to merge
+        combined = archived.sort_values('timestamp', kind='stable')
+    else:
+        df.index = df.index + len(archived)
+        _align_categories(archived, df)
+        combined = pd.concat([archived, df]).sort_values('timestamp', kind='stable')
+    return _deduplicate_log(combined), len(archived) + nrows
+
+def _append_log_tail(df, offset, nrows, seen_keys):
+    """
+    Parse only the bytes appended since offset and merge them into df
+    seen_keys maps each kept row's key to its index label and is updated
+    in place, so only the new rows are hashed
+    Returns the merged frame, the new offset and the new row count
+    """
+    data = _read_log_from(LOG_FILE, offset)
+    if data is None:
+        log_dashboard_event("Log file tail read skipped - file missing", "warning")
+        return df, offset, nrows
+    
+    end = data.rfind(b'\n') + 1
+    if end == 0:
+        return df, offset, nrows
+    
+    new_rows, added = _parse_log_rows(data[:end], names=list(df.columns), start=nrows)
+    if new_rows.empty:
+        return df, offset + end, nrows + added
+    
+    # Later rows win - drop whichever earlier row held the same key
+    replaced = []
+    for key, label in zip(_log_keys(new_rows), new_rows.index):
+        previous = seen_keys.get(key)
+        if previous is not None:
+            replaced.append(previous)
+        seen_keys[key] = label
+    if replaced:
+        log_dashboard_event(f"Removed {len(replaced)} duplicate entries", "warning")
+        df = df.drop(index=[label for label in replaced if label < nrows])
+        new_rows = new_rows.drop(index=[label for label in replaced if label >= nrows])
     
-    log_dashboard_event(f"File lock timeout: {file_path}", "warning")
-    yield None
+    _align_categories(df, new_rows)
+    in_order = new_rows['timestamp'].is_monotonic_increasing and (
+        df.empty or new_rows['timestamp'].iloc[0] >= df['timestamp'].iloc[-1]
+    )
+    df = pd.concat([df, new_rows])
+    if not in_order:
+        df = df.sort_values('timestamp', kind='stable')
+    
+    return df, offset + end, nrows + added
+
+def _export_csv_bytes(df):
+    """Serialise the trade log for download"""
+    return df.to_csv(index=False).encode()
+
+def _pack_close_mask(df):
+    """Store a bit-packed mask of CLOSE actions on the frame's attrs"""
+    # Match CLOSE actions on the few categories, then map to rows by code
+    close_codes = [code for code in df['action'].cat.categories if 'CLOSE' in str(code)]
+    close_mask = df['action'].isin(close_codes).to_numpy()
+    # Stored as bytes - ndarray attrs break the equality check pandas runs on concat
+    df.attrs['close_mask_packed'] = np.packbits(close_mask).tobytes()
+    df.attrs['close_mask_len'] = len(close_mask)
+
+def _close_mask(df):
+    """Unpack the CLOSE action mask stored by _pack_close_mask"""
+    packed = np.frombuffer(df.attrs['close_mask_packed'], dtype=np.uint8)
+    return np.unpackbits(packed, count=df.attrs['close_mask_len']).view(bool)
+
+def _reset_log_state():
+    """Forget the incrementally parsed log so the next load re-reads it"""
+    st.session_state.log_df = None
+    st.session_state.log_offset = 0
+    st.session_state.log_rows = 0
+    st.session_state.log_inode = None
+    st.session_state.seen_keys = None
+    st.session_state.log_archives = None
 
 def load_trading_data():
     """Load and validate trading data with error handling"""
     try:
-        with safe_file_operation(LOG_FILE, 'r') as f:
-            if f is None:
-                st.error("Unable to access log file - it may be locked by another process")
-                log_dashboard_event("Log file access failed - file locked", "error")
-                return pd.DataFrame()
-            
-            df = pd.read_csv(f)
-            
-            # Validate required columns
-            required_cols = ['timestamp', 'symbol', 'price', 'action', 'pnl', 'equity']
-            missing_cols = [col for col in required_cols if col not in df.columns]
-            
-            if missing_cols:
-                st.error(f"Invalid log format. Missing required columns: {', '.join(missing_cols)}")
-                log_dashboard_event(f"Missing columns in log: {missing_cols}", "error")
-                return pd.DataFrame()
-            
-            # Clean and convert data
-            df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
-            
-            # Drop rows with missing timestamps
-            invalid_timestamps = df['timestamp'].isna().sum()
-            if invalid_timestamps > 0:
-                log_dashboard_event(f"Dropped {invalid_timestamps} rows with invalid timestamps", "warning")
-                df = df.dropna(subset=['timestamp'])
-            
-            # Sort by timestamp
-            df = df.sort_values('timestamp')
-            
-            # Remove duplicates based on timestamp, symbol, and action
-            duplicates = df.duplicated(subset=['timestamp', 'symbol', 'action'], keep='last').sum()
-            if duplicates > 0:
-                log_dashboard_event(f"Removed {duplicates} duplicate entries", "warning")
-                df = df.drop_duplicates(subset=['timestamp', 'symbol', 'action'], keep='last')
-            
-            return df
-            
+        if not LOG_FILE.exists():
+            _reset_log_state()
+            return pd.DataFrame()
+        
+        stat = LOG_FILE.stat()
+        df = st.session_state.get('log_df')
+        offset = st.session_state.get('log_offset', 0)
+        nrows = st.session_state.get('log_rows', 0)
+        previous_df = df
+        archives = _archive_signature()
+        
+        # Full reload when nothing is cached, the file was replaced/truncated
+        # or the bot rotated rows out into a new archive
+        if (df is None or df.empty or stat.st_ino != st.session_state.get('log_inode')
+                or stat.st_size < offset or archives != st.session_state.get('log_archives')):
+            df, offset, nrows = _load_trading_data_cached(str(LOG_FILE), stat.st_mtime, stat.st_size)
+            if archives and not df.columns.empty:
+                df, nrows = _prepend_archives(_load_log_archives(archives), df, nrows)
+            st.session_state.seen_keys = dict(zip(_log_keys(df), df.index)) if not df.empty else {}
+        elif stat.st_size > offset:
+            df, offset, nrows = _append_log_tail(df, offset, nrows, st.session_state.seen_keys)
+        
+        if df is not previous_df and not df.empty:
+            _pack_close_mask(df)
+        
+        st.session_state.log_df = df
+        st.session_state.log_offset = offset
+        st.session_state.log_rows = nrows
+        st.session_state.log_inode = stat.st_ino
+        st.session_state.log_archives = archives
+        return df
+        
     except Exception as e:
         log_dashboard_event(f"Data loading error: {str(e)}", "error")
         st.error(f"Error loading trading data: {str(e)}")
+        _reset_log_state()
         return pd.DataFrame()
 
-def get_bot_status():
-    """Get detailed bot status information"""
+def _is_bot_process(proc):
+    """Check whether a process is running the bot script"""
+    try:
+        return any(BOT_SCRIPT.name in str(cmd) for cmd in proc.cmdline())
+    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+        return False
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _get_proc(pid, create_time):
+    """
+    Shared Process handle for the bot, keyed on (pid, create_time)
+    Keeping one instance alive lets cpu_percent() measure between reruns
+    Raises NoSuchProcess if the PID now belongs to a different process
+    """
+    proc = psutil.Process(pid)
+    if proc.create_time() != create_time:
+        raise psutil.NoSuchProcess(pid)
+    proc.cpu_percent(None)  # Prime the CPU counters
+    return proc
+
+def _remember_bot_process(proc):
+    """Cache the bot's identity and return its shared Process handle"""
+    create_time = proc.create_time()
+    st.session_state.bot_pid = proc.pid
+    st.session_state.bot_create_time = create_time
+    return _get_proc(proc.pid, create_time)
+
+def _forget_bot_process():
+    """Drop the cached bot identity from session state"""
+    st.session_state.bot_pid = None
+    st.session_state.bot_create_time = None
+
+def _find_bot_process():
+    """
+    Locate the running bot process
+    Reuses the shared Process for the cached PID and only scans the
+    process table when it is gone or now belongs to another program
+    """
+    pid = st.session_state.get('bot_pid')
+    create_time = st.session_state.get('bot_create_time')
+    try:
+        if pid and create_time is not None:
+            proc = _get_proc(pid, create_time)
+            if proc.is_running():
+                return proc
+        elif pid and psutil.pid_exists(pid):
+            # PID recorded by start_bot_process - confirm it before caching
+            proc = psutil.Process(pid)
+            if _is_bot_process(proc):
+                return _remember_bot_process(proc)
+    except psutil.NoSuchProcess:
+        pass
+    
+    # Cached PID is stale - scan, reading cmdline lazily per process
+    for proc in psutil.process_iter():
+        if _is_bot_process(proc):
+            try:
+                return _remember_bot_process(proc)
+            except psutil.NoSuchProcess:
+                continue
+    
+    _forget_bot_process()
+    return None
+
+def get_bot_status(df=None):
+    """
+    Get detailed bot status information, reusing a status under BOT_STATUS_TTL seconds old
+    Pass the already loaded trade log as df to avoid reloading it
+    """
+    now = time.monotonic()
+    cached = st.session_state.get('bot_status_cache')
+    if cached and now - cached[0] < BOT_STATUS_TTL:
+        return cached[1]
+    
+    status = _compute_bot_status(df)
+    st.session_state.bot_status_cache = (now, status)
+    return status
+
+def _compute_bot_status(df=None):
+    """Collect the bot's process details and last log activity"""
     status = {
         "running": False,
         "pid": None,
         "start_time": None,
         "last_activity": None,
         "memory_usage": 0,
-        "cpu_usage": 0
+        "cpu_usage": None  # Unknown until a second CPU sample exists
     }
     
     try:
-        # Check for running bot processes
-        for proc in psutil.process_iter(['pid', 'name', 'cmdline', 'create_time']):
+        # Check for running bot process
+        process = _find_bot_process()
+        if process is not None:
+            # The first reading in a session only spans the time since priming
+            cpu_key = (process.pid, st.session_state.bot_create_time)
+            sampled = st.session_state.get('bot_cpu_key') == cpu_key
             try:
-                if any('bue_flashbot_virtual.py' in str(cmd) for cmd in proc.info['cmdline']):
+                with process.oneshot():
                     status["running"] = True
-                    status["pid"] = proc.info['pid']
-                    status["start_time"] = datetime.fromtimestamp(proc.info['create_time'])
+                    status["pid"] = process.pid
+                    status["start_time"] = datetime.fromtimestamp(process.create_time())
                     
                     # Get resource usage
-                    process = psutil.Process(proc.info['pid'])
                     status["memory_usage"] = process.memory_info().rss / 1024 / 1024  # MB
-                    status["cpu_usage"] = process.cpu_percent()
-                    break
+                    cpu_usage = process.cpu_percent(None)
+                    if sampled:
+                        status["cpu_usage"] = cpu_usage
+                
+                st.session_state.bot_cpu_key = cpu_key
                     
             except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
+                _forget_bot_process()
+                status["running"] = False
+                status["pid"] = None
+                status["start_time"] = None
                 
     except Exception as e:
         log_dashboard_event(f"Error checking bot status: {e}", "warning")
     
     # Get last activity from log file
     try:
-        df = load_trading_data()
+        if df is None:
+            df = load_trading_data()
         if not df.empty:
             status["last_activity"] = df['timestamp'].max()
     except:
@@ -181,6 +475,7 @@ def get_bot_status():
 def start_bot_process():
     """Start the bot process with error handling"""
     try:
+        st.session_state.pop('bot_status_cache', None)
         bot_status = get_bot_status()
         if bot_status["running"]:
             st.warning("⚠️ Bot is already running!")
@@ -199,8 +494,14 @@ def start_bot_process():
         
         # Store process info in session state
         st.session_state.bot_process = process
+        st.session_state.bot_pid = process.pid
+        st.session_state.bot_create_time = None
         st.session_state.bot_start_time = datetime.now()
         
+        # The process table changed - let the next scan see it
+        psutil.process_iter.cache_clear()
+        st.session_state.pop('bot_status_cache', None)
+        
         log_dashboard_event(f"Bot started with PID: {process.pid}")
         return True
         
@@ -212,6 +513,7 @@ def start_bot_process():
 def stop_bot_process():
     """Stop the bot process gracefully"""
     try:
+        st.session_state.pop('bot_status_cache', None)
         bot_status = get_bot_status()
         if not bot_status["running"]:
             st.info("Bot is not running")
@@ -220,6 +522,10 @@ def stop_bot_process():
         # Send termination signal
         process = psutil.Process(bot_status["pid"])
         process.terminate()
+        _get_proc.clear()
+        _forget_bot_process()
+        psutil.process_iter.cache_clear()
+        st.session_state.pop('bot_status_cache', None)
         
         # Wait for graceful shutdown
         try:
@@ -237,8 +543,11 @@ def stop_bot_process():
         st.error(f"Error stopping bot: {e}")
         return False
 
-def make_deposit_transaction(amount):
-    """Process deposit transaction with validation"""
+def make_deposit_transaction(amount, current_df=None):
+    """
+    Process deposit transaction with validation
+    Pass the already loaded trade log as current_df to avoid reloading it
+    """
     if amount <= 0:
         st.error("Invalid deposit amount")
         return False
@@ -248,17 +557,11 @@ def make_deposit_transaction(amount):
         header = ["session_id", "timestamp", "symbol", "price", "bue", "delta", 
                  "signal", "value_estimate", "action", "pnl", "close_reason", "equity"]
         
-        # Ensure log file exists
-        if not LOG_FILE.exists():
-            with safe_file_operation(LOG_FILE, 'w') as f:
-                if f is not None:
-                    writer = csv.writer(f)
-                    writer.writerow(header)
-        
         # Get current equity
-        current_df = load_trading_data()
+        if current_df is None:
+            current_df = load_trading_data()
         current_equity = current_df['equity'].iloc[-1] if not current_df.empty else 1000.0
-        new_equity = current_equity + amount
+        new_equity = float(current_equity) + amount
         
         # Create deposit record
         session_id = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -268,28 +571,89 @@ def make_deposit_transaction(amount):
             session_id, timestamp, "SYSTEM", 0, 0, 0, "DEPOSIT",
             amount, "DEPOSIT", 0, "N/A", new_equity
         ]
+        # Every field is a plain value, so no CSV quoting is needed
+        deposit_line = ",".join(map(str, deposit_row)) + "\n"
         
-        # Write deposit record
-        with safe_file_operation(LOG_FILE, 'a') as f:
-            if f is not None:
-                writer = csv.writer(f)
-                writer.writerow(deposit_row)
-                log_dashboard_event(f"Deposit processed: £{amount}")
-                return True
+        # Write deposit record as one O_APPEND write, which lands atomically
+        fd = os.open(LOG_FILE, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size == 0:
+                deposit_line = ",".join(header) + "\n" + deposit_line
+            _write_all(fd, deposit_line.encode())
+        finally:
+            os.close(fd)
         
-        return False
+        log_dashboard_event(f"Deposit processed: £{amount}")
+        return True
         
     except Exception as e:
         log_dashboard_event(f"Deposit error: {e}", "error")
         st.error(f"Deposit failed: {e}")
         return False
 
+@st.cache_data(show_spinner=False, max_entries=1)
+def _equity_fig(n_rows, last_ts, _df):
+    """
+    Build the equity curve figure, or None with fewer than two points
+    Keyed on row count and last timestamp rather than hashing the frame
+    """
+    equity_data = _df[['timestamp', 'equity']].drop_duplicates(subset=['timestamp']).sort_values('timestamp')
+    if len(equity_data) <= 1:
+        return None
+    
+    fig_equity = px.line(
+        equity_data,
+        x='timestamp',
+        y='equity',
+        title="Portfolio Equity Timeline",
+        labels={'equity': 'Equity (£)', 'timestamp': 'Time'}
+    )
+    fig_equity.update_traces(line_color='#00ff88', line_width=3)
+    fig_equity.update_layout(
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        xaxis=dict(showgrid=True, gridcolor='rgba(128,128,128,0.2)'),
+        yaxis=dict(showgrid=True, gridcolor='rgba(128,128,128,0.2)')
+    )
+    return fig_equity
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def _pnl_hist_fig(n_rows, last_ts, _pnl_data):
+    """
+    Build the P&L histogram figure, or None with five trades or fewer
+    Keyed on row count and last timestamp rather than hashing the series
+    """
+    if len(_pnl_data) <= 5:
+        return None
+    
+    fig_pnl = px.histogram(
+        _pnl_data,
+        title="Trade P&L Distribution",
+        labels={'value': 'P&L (£)', 'count': 'Number of Trades'},
+        nbins=min(20, len(_pnl_data))
+    )
+    fig_pnl.update_layout(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)')
+    return fig_pnl
+
+def _pnl_styles(col):
+    """CSS colours for a P&L column: green for gains, red for losses"""
+    values = col.to_numpy()
+    return np.where(values > 0, 'color: #00ff88', np.where(values < 0, 'color: #ff4444', ''))
+
 # Initialize session state
-if 'last_refresh' not in st.session_state:
-    st.session_state.last_refresh = time.time()
 if 'deposit_success' not in st.session_state:
     st.session_state.deposit_success = False
 
+# Load the trade log once per rerun and derive the shared views from it
+df = load_trading_data()
+bot_status = get_bot_status(df=df)
+
+if not df.empty:
+    latest_equity = df['equity'].iloc[-1]
+    total_deposits = df.loc[df['action'] == 'DEPOSIT', 'value_estimate'].sum()
+    close_mask = _close_mask(df)
+    nonzero_pnl_mask = df['pnl'] != 0
+
 # Main dashboard layout
 col1, col2 = st.columns([2, 1])
 
@@ -297,9 +661,6 @@ with col2:
     # Sidebar: Bot Control Panel
     st.markdown("### 🤖 Bot Control Panel")
     
-    # Get current bot status
-    bot_status = get_bot_status()
-    
     # Display bot status with timestamp
     if bot_status["running"]:
         st.success("✅ Bot Running")
@@ -319,7 +680,6 @@ with col2:
             with st.spinner("Stopping bot..."):
                 if stop_bot_process():
                     st.success("Bot stopped successfully")
-                    time.sleep(1)
                     st.rerun()
     else:
         st.error("⏹️ Bot Stopped")
@@ -329,7 +689,6 @@ with col2:
             with st.spinner("Starting bot..."):
                 if start_bot_process():
                     st.success("Bot started successfully")
-                    time.sleep(2)  # Give bot time to initialize
                     st.rerun()
     
     st.markdown("---")
@@ -337,20 +696,14 @@ with col2:
     # Portfolio Management
     st.markdown("### 💰 Portfolio Management")
     
-    # Load current data for portfolio display
-    df = load_trading_data()
-    
     if not df.empty:
-        current_equity = df['equity'].iloc[-1]
-        total_deposits = df[df['action'] == 'DEPOSIT']['value_estimate'].sum()
-        
         # Display current stats
-        st.metric("Current Equity", f"£{current_equity:.2f}")
+        st.metric("Current Equity", f"£{latest_equity:.2f}")
         st.metric("Total Deposits", f"£{total_deposits:.2f}")
         
         # Calculate performance metrics
         if total_deposits > 0:
-            performance = ((current_equity - total_deposits) / total_deposits) * 100
+            performance = ((latest_equity - total_deposits) / total_deposits) * 100
             st.metric("Performance", f"{performance:+.2f}%")
     else:
         st.metric("Current Equity", "£1,000.00")
@@ -369,10 +722,9 @@ with col2:
     
     if st.button("💳 Deposit Funds", key="deposit_btn"):
         with st.spinner("Processing deposit..."):
-            if make_deposit_transaction(deposit_amount):
+            if make_deposit_transaction(deposit_amount, current_df=df):
                 st.session_state.deposit_success = True
                 st.success(f"✅ Deposited £{deposit_amount:.2f}")
-                time.sleep(1)
                 st.rerun()
             else:
                 st.error("❌ Deposit failed")
@@ -386,9 +738,6 @@ with col1:
     # Main content area
     st.markdown("### 📊 Trading Dashboard")
     
-    # Load and validate trading data
-    df = load_trading_data()
-    
     if df.empty:
         st.info("🚀 No trading data yet. Start the bot to begin simulation.")
         st.markdown("""
@@ -400,10 +749,9 @@ with col1:
         """)
     else:
         # Performance summary
-        latest_equity = df['equity'].iloc[-1]
-        total_trades = len(df[df['action'].str.contains('CLOSE', na=False)])
-        winning_trades = len(df[(df['action'].str.contains('CLOSE', na=False)) & (df['pnl'] > 0)])
-        total_pnl = df[df['pnl'] != 0]['pnl'].sum()
+        total_trades = int(np.count_nonzero(close_mask))
+        winning_trades = int((close_mask & (df['pnl'] > 0)).sum())
+        total_pnl = df.loc[nonzero_pnl_mask, 'pnl'].sum()
         
         # Display key metrics
         metric_col1, metric_col2, metric_col3, metric_col4 = st.columns(4)
@@ -424,36 +772,15 @@ with col1:
         with tab1:
             # Equity curve - main P&L line graph
             st.markdown("#### Portfolio Equity Over Time")
-            equity_data = df[['timestamp', 'equity']].drop_duplicates(subset=['timestamp']).sort_values('timestamp')
-            
-            if len(equity_data) > 1:
-                fig_equity = px.line(
-                    equity_data,
-                    x='timestamp',
-                    y='equity',
-                    title="Portfolio Equity Timeline",
-                    labels={'equity': 'Equity (£)', 'timestamp': 'Time'}
-                )
-                fig_equity.update_traces(line_color='#00ff88', line_width=3)
-                fig_equity.update_layout(
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    xaxis=dict(showgrid=True, gridcolor='rgba(128,128,128,0.2)'),
-                    yaxis=dict(showgrid=True, gridcolor='rgba(128,128,128,0.2)')
-                )
+            log_key = (len(df), int(df['timestamp'].iat[-1].value))
+            fig_equity = _equity_fig(*log_key, df)
+            if fig_equity is not None:
                 st.plotly_chart(fig_equity, use_container_width=True)
             
             # P&L distribution
-            pnl_data = df[df['pnl'] != 0]['pnl']
-            if not pnl_data.empty and len(pnl_data) > 5:
+            fig_pnl = _pnl_hist_fig(*log_key, df.loc[nonzero_pnl_mask, 'pnl'])
+            if fig_pnl is not None:
                 st.markdown("#### P&L Distribution")
-                fig_pnl = px.histogram(
-                    pnl_data,
-                    title="Trade P&L Distribution",
-                    labels={'value': 'P&L (£)', 'count': 'Number of Trades'},
-                    nbins=min(20, len(pnl_data))
-                )
-                fig_pnl.update_layout(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)')
                 st.plotly_chart(fig_pnl, use_container_width=True)
         
         with tab2:
@@ -474,32 +801,31 @@ with col1:
                     key="action_filter_v21"
                 )
             
-            # Apply filters
-            filtered_df = df.copy()
+            # Apply filters as one mask and only materialise the last 50 matches
+            filter_mask = None
             if symbol_filter:
-                filtered_df = filtered_df[filtered_df['symbol'].isin(symbol_filter)]
+                filter_mask = df['symbol'].isin(symbol_filter)
             if action_filter:
-                filtered_df = filtered_df[filtered_df['action'].isin(action_filter)]
+                action_mask = df['action'].isin(action_filter)
+                filter_mask = action_mask if filter_mask is None else filter_mask & action_mask
             
             # Display recent activity with clean formatting
-            recent_data = filtered_df.tail(50).sort_values('timestamp', ascending=False)
+            if filter_mask is None:
+                recent_data = df.tail(50)
+            else:
+                recent_data = df.iloc[np.flatnonzero(filter_mask.to_numpy())[-50:]]
+            recent_data = recent_data.sort_values('timestamp', ascending=False)
             
             if not recent_data.empty:
                 display_df = recent_data[['timestamp', 'symbol', 'action', 'price', 'pnl', 'equity']].copy()
+                display_df.attrs = {}  # The packed CLOSE mask is not for display
                 display_df['timestamp'] = display_df['timestamp'].dt.strftime('%H:%M:%S')
                 display_df['price'] = display_df['price'].round(6)
                 display_df['pnl'] = display_df['pnl'].round(2)
                 display_df['equity'] = display_df['equity'].round(2)
                 
                 # Color code P&L
-                def color_pnl(val):
-                    if val > 0:
-                        return 'color: #00ff88'
-                    elif val < 0:
-                        return 'color: #ff4444'
-                    return ''
-                
-                styled_df = display_df.style.applymap(color_pnl, subset=['pnl'])
+                styled_df = display_df.style.apply(_pnl_styles, axis=0, subset=['pnl'])
                 st.dataframe(styled_df, use_container_width=True, height=400)
             else:
                 st.info("No activity matching current filters")
@@ -507,40 +833,50 @@ with col1:
         with tab3:
             st.markdown("#### Trade Performance Analysis")
             
+            # Best/worst trades and per-symbol stats share one lazy scan of the P&L rows
+            pnl_rows = pl.from_pandas(
+                df.loc[nonzero_pnl_mask, ['symbol', 'pnl', 'close_reason', 'timestamp']]
+                .assign(is_close=close_mask[nonzero_pnl_mask.to_numpy()])
+            ).lazy().with_columns(pl.col('symbol').cast(pl.Utf8))
+            closed_rows = pnl_rows.filter(pl.col('is_close'))
+            trade_columns = [
+                pl.col('symbol'),
+                pl.col('pnl').round(2),
+                pl.col('close_reason'),
+                pl.col('timestamp').dt.strftime('%m/%d %H:%M')
+            ]
+            best_query = (closed_rows.filter(pl.col('pnl') > 0)
+                          .top_k(5, by='pnl').sort('pnl', descending=True).select(trade_columns))
+            worst_query = (closed_rows.filter(pl.col('pnl') < 0)
+                           .bottom_k(5, by='pnl').sort('pnl').select(trade_columns))
+            stats_query = (pnl_rows.group_by('symbol').agg([
+                pl.col('pnl').sum().alias('Total P&L'),
+                pl.col('pnl').count().alias('Trade Count'),
+                pl.col('pnl').mean().alias('Avg P&L')
+            ]).sort('Total P&L', descending=True).head(10))
+            top_5, bottom_5, symbol_stats = pl.collect_all([best_query, worst_query, stats_query])
+            
             # Top performers
             perf_col1, perf_col2 = st.columns(2)
             
             with perf_col1:
                 st.markdown("**🟢 Best Trades**")
-                best_trades = df[(df['pnl'] > 0) & (df['action'].str.contains('CLOSE', na=False))]
-                if not best_trades.empty:
-                    top_5 = best_trades.nlargest(5, 'pnl')[['symbol', 'pnl', 'close_reason', 'timestamp']]
-                    top_5['pnl'] = top_5['pnl'].round(2)
-                    top_5['timestamp'] = top_5['timestamp'].dt.strftime('%m/%d %H:%M')
-                    st.dataframe(top_5, hide_index=True)
+                if top_5.height > 0:
+                    st.dataframe(top_5.to_pandas(), hide_index=True)
                 else:
                     st.info("No profitable trades yet")
             
             with perf_col2:
                 st.markdown("**🔴 Worst Trades**")
-                worst_trades = df[(df['pnl'] < 0) & (df['action'].str.contains('CLOSE', na=False))]
-                if not worst_trades.empty:
-                    bottom_5 = worst_trades.nsmallest(5, 'pnl')[['symbol', 'pnl', 'close_reason', 'timestamp']]
-                    bottom_5['pnl'] = bottom_5['pnl'].round(2)
-                    bottom_5['timestamp'] = bottom_5['timestamp'].dt.strftime('%m/%d %H:%M')
-                    st.dataframe(bottom_5, hide_index=True)
+                if bottom_5.height > 0:
+                    st.dataframe(bottom_5.to_pandas(), hide_index=True)
                 else:
                     st.info("No losing trades yet")
             
             # Symbol performance summary
             if total_trades > 0:
                 st.markdown("**📈 Symbol Performance Summary**")
-                symbol_stats = df[df['pnl'] != 0].groupby('symbol').agg({
-                    'pnl': ['sum', 'count', 'mean']
-                }).round(2)
-                
-                symbol_stats.columns = ['Total P&L', 'Trade Count', 'Avg P&L']
-                symbol_stats = symbol_stats.sort_values('Total P&L', ascending=False).head(10)
+                symbol_stats = symbol_stats.to_pandas().set_index('symbol').round(2)
                 
                 st.dataframe(symbol_stats, use_container_width=True)
 
@@ -564,27 +900,25 @@ with status_col2:
 with status_col3:
     st.info(f"🕒 Page Refresh: {datetime.now().strftime('%H:%M:%S')}")
 
-# Auto-refresh mechanism (every 30 seconds)
-current_time = time.time()
-if current_time - st.session_state.last_refresh > 30:
-    st.session_state.last_refresh = current_time
-    st.rerun()
-
-# Progress bar for next refresh
-time_since_refresh = current_time - st.session_state.last_refresh
-refresh_progress = min(time_since_refresh / 30, 1.0)
-st.progress(refresh_progress)
+# Auto-refresh mechanism (every 30 seconds, timed in the browser)
+st_autorefresh(interval=REFRESH_INTERVAL_MS, key="dash_refresh")
 
 # Export functionality
 if not df.empty:
     with st.expander("📤 Export Data"):
         st.markdown("Download your trading data for external analysis")
         
-        csv_data = df.to_csv(index=False)
-        st.download_button(
-            label="📥 Download CSV",
-            data=csv_data,
-            file_name=f"spiralbot_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-            mime="text/csv",
-            key="export_csv_v21"
-        )
\ No newline at end of file
+        # Encode only on request - the log changes every scan, so reruns can't reuse it
+        if st.button("📦 Prepare Export", key="prepare_export_btn"):
+            st.session_state.export_csv = (_export_csv_bytes(df), len(df), datetime.now())
+        
+        if 'export_csv' in st.session_state:
+            export_data, export_rows, prepared_at = st.session_state.export_csv
+            st.caption(f"Snapshot of {export_rows:,} rows prepared at {prepared_at.strftime('%H:%M:%S')}")
+            st.download_button(
+                label="📥 Download CSV",
+                data=export_data,
+                file_name=f"spiralbot_data_{prepared_at.strftime('%Y%m%d_%H%M%S')}.csv",
+                mime="text/csv",
+                key="export_csv_v21"
+            )
\ No newline at end of file